@@ -1,13 +1,22 @@
 from __future__ import annotations
+import json
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Final, List, Dict
+from typing import AsyncIterator, Final, Iterator, List, Dict
 
 from fastapi import FastAPI, HTTPException, status
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
-from backend.utils import get_agent_response  # noqa: WPS433 import from parent
+from backend.utils import (  # noqa: WPS433 import from parent
+    THREADED_COMPLETION,
+    async_http_session,
+    get_agent_response_async,
+    get_agent_response_threaded,
+    resolve_model_providers,
+    stream_agent_response,
+)
 
 """FastAPI application entry-point for the recipe chatbot."""
 
@@ -17,7 +26,22 @@ from backend.utils import get_agent_response  # noqa: WPS433 import from parent
 # -----------------------------------------------------------------------------
 
 APP_TITLE: Final[str] = "Recipe Chatbot"
-app = FastAPI(title=APP_TITLE)
+
+# Sync-only providers are served from a worker thread so they don't block the loop.
+respond = get_agent_response_threaded if THREADED_COMPLETION else get_agent_response_async
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Validate the model configuration and keep one pooled HTTP client open."""
+
+    # Fail at startup, not on the first chat request, if MODEL_NAME is invalid.
+    resolve_model_providers()
+    async with async_http_session():
+        yield
+
+
+app = FastAPI(title=APP_TITLE, lifespan=lifespan)
 
 # Serve static assets (currently just the HTML) under `/static/*`.
 STATIC_DIR = Path(__file__).parent.parent / "frontend"
@@ -71,7 +95,7 @@ async def chat_endpoint(payload: ChatRequest) -> ChatResponse:  # noqa: WPS430
     ]
 
     try:
-        updated_messages_dicts = get_agent_response(request_messages)
+        updated_messages_dicts = await respond(request_messages)
     except Exception as exc:  # noqa: BLE001 broad; surface as HTTP 500
         # In production you would log the traceback here.
         raise HTTPException(
@@ -86,6 +110,29 @@ async def chat_endpoint(payload: ChatRequest) -> ChatResponse:  # noqa: WPS430
     return ChatResponse(messages=response_messages)
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest) -> StreamingResponse:  # noqa: WPS430
+    """Streaming variant of ``/chat``.
+
+    Emits the assistant's reply as server-sent events, one ``{"delta": ...}``
+    JSON object per fragment, followed by a final ``[DONE]`` event.
+    """
+    request_messages: List[Dict[str, str]] = [
+        msg.model_dump() for msg in payload.messages
+    ]
+
+    def event_stream() -> Iterator[str]:
+        try:
+            for delta in stream_agent_response(request_messages):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        except Exception as exc:  # noqa: BLE001 headers are already sent
+            yield f"data: {json.dumps({'error': str(exc)})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    # Starlette iterates the synchronous generator in a worker thread.
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/", response_class=HTMLResponse)
 async def index() -> HTMLResponse:  # noqa: WPS430
     """Serve the chat UI."""
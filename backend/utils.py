@@ -1,15 +1,41 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
 from pathlib import Path
-from typing import Final, List, Dict
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Final,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
 
-import litellm  # type: ignore
+import httpx
 from dotenv import load_dotenv
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 """Utility helpers for the recipe chatbot backend.
 
 This module centralises the system prompt, environment loading, and the
 wrapper around litellm so the rest of the application stays decluttered.
+litellm itself is heavy to import, so it is only loaded on the first model call.
 """
 
 
@@ -20,7 +46,7 @@ load_dotenv(override=False)
 
 SYSTEM_PROMPT: Final[
     str
-] = f"""You are a friendly and creative culinary assistant specializing in providing recipes from Turkish cuisine.
+] = """You are a friendly and creative culinary assistant specializing in providing recipes from Turkish cuisine.
 
 ## Rules
 - Always answer in English.
@@ -87,22 +113,757 @@ A beloved Turkish classic featuring roasted eggplants stuffed with a flavorful m
 * This dish tastes even better the next day after the flavors have had time to meld together.
 ```
 
-"""  # noqa: F541
+"""
+
+# Shared system message prepended to every conversation. It is never mutated, so a
+# single dict can be reused instead of building a new one per request.
+_SYSTEM_MSG: Final[Dict[str, str]] = {"role": "system", "content": SYSTEM_PROMPT}
 
 # Fetch configuration *after* we loaded the .env file.
-MODEL_NAME: Final[str] = (
-    Path.cwd().with_suffix("")  # noqa: WPS432  # dummy call to satisfy linters about unused Path
-    and (  # noqa: W504 line break for readability
-        __import__("os").environ.get("MODEL_NAME", "gpt-3.5-turbo")
+MODEL_NAME: Final[str] = os.environ.get("MODEL_NAME", "gpt-3.5-turbo")
+
+# Optional two-tier cascade: short, routine questions go to CHEAP_MODEL and
+# anything that looks demanding goes to STRONG_MODEL. Both default to MODEL_NAME,
+# which leaves the cascade switched off.
+STRONG_MODEL: Final[str] = os.environ.get("STRONG_MODEL", MODEL_NAME)
+CHEAP_MODEL: Final[str] = os.environ.get("CHEAP_MODEL", STRONG_MODEL)
+CASCADE_MAX_CHARS: Final[int] = int(os.environ.get("RECIPE_CASCADE_MAX_CHARS", "300"))
+CASCADE_STRONG_PATTERN: Final[re.Pattern[str]] = re.compile(
+    r"\b(explain|why|how does|science|chemistry|compare|difference between|"
+    r"history of|menu|meal plan|nutrition|substitut\w*)\b",
+    re.IGNORECASE,
+)
+
+# Batch prompting packs several independent questions into one request and asks
+# for answers prefixed with "### Answer <i>:" so they can be split apart again.
+BATCH_PROMPT_HEADER: Final[str] = (
+    "Answer each of the following questions independently. Start every answer "
+    "with '### Answer <i>:' where <i> is the question number, and do not add "
+    "anything before the first answer."
+)
+_BATCH_ANSWER_RE: Final[re.Pattern[str]] = re.compile(
+    r"### Answer (\d+):\s*(.*?)(?=### Answer \d+:|$)", re.DOTALL
+)
+
+# Anthropic only reuses a cached prompt prefix when it is explicitly marked with a
+# ``cache_control`` block; OpenAI caches identical leading prefixes automatically.
+# Both ignore prefixes shorter than a minimum (1024 tokens, 2048 for Claude Haiku),
+# and the current SYSTEM_PROMPT (~900 tokens) is below it, so the marker is only
+# added once the prompt grows past the limit.
+PROMPT_CACHE_CONTROL: Final[Dict[str, str]] = {"type": "ephemeral", "ttl": "1h"}
+PROMPT_CACHE_MIN_TOKENS: Final[int] = 1024
+PROMPT_CACHE_MIN_TOKENS_HAIKU: Final[int] = 2048
+
+# Opt-in exact-match response cache. Only enable this for deployments where the
+# model is effectively deterministic (temperature=0), otherwise repeated
+# conversations would always receive the same reply.
+CACHE_ENABLED: Final[bool] = os.environ.get("RECIPE_CACHE") == "1"
+CACHE_TTL: Final[float] = float(os.environ.get("RECIPE_CACHE_TTL", "86400"))
+
+# Both response caches persist to this SQLite file, shared by every worker process.
+CACHE_PATH: Final[Path] = Path(os.environ.get("RECIPE_CACHE_PATH", ".recipe_cache.db"))
+
+# Run the blocking ``litellm.completion`` in a worker thread instead of awaiting
+# ``litellm.acompletion``, for providers whose integration is sync-only.
+THREADED_COMPLETION: Final[bool] = os.environ.get("RECIPE_THREADED_COMPLETION") == "1"
+
+# Long conversations are compacted before sending: once there are more than
+# HISTORY_SUMMARY_TRIGGER turns, older ones are replaced by a running summary
+# written by CHEAP_MODEL and only the latest HISTORY_KEEP_LAST or more are sent
+# verbatim. A trigger of 0 disables compaction.
+HISTORY_KEEP_LAST: Final[int] = int(os.environ.get("RECIPE_HISTORY_KEEP_LAST", "8"))
+HISTORY_SUMMARY_TRIGGER: Final[int] = int(
+    os.environ.get("RECIPE_HISTORY_SUMMARY_TRIGGER", "16")
+)
+
+
+def _history_step(keep_last: int, summary_trigger: int) -> int:
+    """Validate a compaction window and return how many turns each summary adds.
+
+    The step must be positive and even: cut points are multiples of it, so an
+    even step keeps the verbatim tail starting on a user turn.
+    """
+
+    step = summary_trigger - keep_last
+    if keep_last < 1 or step <= 0 or step % 2:
+        raise ValueError(
+            "History compaction needs keep_last >= 1 and summary_trigger larger "
+            f"than keep_last by an even number (got keep_last={keep_last}, "
+            f"summary_trigger={summary_trigger})."
+        )
+    return step
+
+
+# Fail at import on a bad RECIPE_HISTORY_* pair rather than on long conversations.
+if HISTORY_SUMMARY_TRIGGER > 0:
+    _history_step(HISTORY_KEEP_LAST, HISTORY_SUMMARY_TRIGGER)
+
+SUMMARY_PROMPT: Final[str] = (
+    "Summarize this dialog between a user and a Turkish-cuisine recipe assistant "
+    "in at most 200 tokens. Keep the dishes discussed and any ingredients, "
+    "dietary constraints, equipment limits or preferences the user mentioned."
+)
+_SUMMARY_CACHE_MAXSIZE: Final[int] = 256
+
+# Opt-in semantic cache: paraphrased first questions ("how do I make karnıyarık"
+# vs "recipe for stuffed eggplant") reuse an earlier reply when their sentence
+# embeddings are similar enough. Requires the optional ``sentence-transformers``
+# and ``numpy`` packages.
+SEMANTIC_CACHE_ENABLED: Final[bool] = os.environ.get("RECIPE_SEMANTIC_CACHE") == "1"
+SEMANTIC_CACHE_MODEL: Final[str] = os.environ.get(
+    "RECIPE_SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2"
+)
+SEMANTIC_CACHE_THRESHOLD: Final[float] = float(
+    os.environ.get("RECIPE_SEMANTIC_CACHE_THRESHOLD", "0.92")
+)
+SEMANTIC_CACHE_TTL: Final[float] = float(
+    os.environ.get("RECIPE_SEMANTIC_CACHE_TTL", "86400")
+)
+
+# Keep-alive HTTP connections for providers litellm drives through the OpenAI SDK
+# such as OpenAI and Azure, so repeated calls skip the TCP and TLS handshake.
+# litellm only reads these clients on that path; other providers keep using
+# their own connection handling.
+HTTP_TIMEOUT: Final[float] = 60.0
+HTTP_LIMITS: Final[httpx.Limits] = httpx.Limits(
+    max_keepalive_connections=32, max_connections=64
+)
+
+
+# --- litellm loading -------------------------------------------------------------
+
+_litellm: Any = None
+_litellm_lock = threading.Lock()
+
+
+def _get_litellm() -> Any:
+    """Import litellm on first use and install the shared sync HTTP client."""
+
+    global _litellm
+    if _litellm is None:
+        with _litellm_lock:
+            if _litellm is None:
+                import litellm  # type: ignore
+
+                litellm.client_session = httpx.Client(
+                    timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS
+                )
+                atexit.register(litellm.client_session.close)
+                _litellm = litellm
+    return _litellm
+
+
+def _is_transient_error(exc: BaseException) -> bool:
+    """Return whether *exc* is a provider hiccup worth retrying (429, 5xx, network)."""
+
+    litellm = _get_litellm()
+    return isinstance(
+        exc,
+        (
+            litellm.RateLimitError,
+            litellm.APIConnectionError,
+            litellm.InternalServerError,
+            litellm.ServiceUnavailableError,
+        ),
     )
+
+
+# Jittered exponential backoff spreads retries out instead of having every
+# throttled request hit the provider again at the same moment.
+_retry_transient = retry(
+    wait=wait_exponential_jitter(multiplier=0.5, max=8),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_transient_error),
+    reraise=True,
 )
 
 
+_providers: Dict[str, str] = {}
+
+
+def resolve_model_providers() -> Dict[str, str]:
+    """Resolve the litellm provider of every configured model, once.
+
+    Called at application startup so a misspelled ``MODEL_NAME`` (or cascade
+    model) fails immediately instead of on the first request. The result is
+    passed to litellm as ``custom_llm_provider`` so it does not have to guess
+    the provider from the model name on every call.
+    """
+
+    litellm = _get_litellm()
+    for model in (MODEL_NAME, CHEAP_MODEL, STRONG_MODEL):
+        if model not in _providers:
+            _, provider, _, _ = litellm.get_llm_provider(model)
+            _providers[model] = provider
+    return dict(_providers)
+
+
+def _with_provider(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the pre-resolved ``custom_llm_provider`` for ``kwargs["model"]``."""
+
+    if not _providers:
+        resolve_model_providers()
+    provider = _providers.get(kwargs["model"])
+    if provider is not None:
+        kwargs.setdefault("custom_llm_provider", provider)
+    return kwargs
+
+
+@_retry_transient
+def _completion(**kwargs: Any) -> Any:
+    """``litellm.completion`` with retries on transient provider errors."""
+
+    # _retry_transient is the only retry layer; the OpenAI SDK would otherwise
+    # retry each attempt again on its own.
+    kwargs.setdefault("max_retries", 0)
+    return _get_litellm().completion(**_with_provider(kwargs))
+
+
+@_retry_transient
+async def _acompletion(**kwargs: Any) -> Any:
+    """``litellm.acompletion`` with retries on transient provider errors."""
+
+    kwargs.setdefault("max_retries", 0)
+    return await _get_litellm().acompletion(**_with_provider(kwargs))
+
+
+@contextlib.asynccontextmanager
+async def async_http_session() -> AsyncIterator[None]:
+    """Share one keep-alive ``httpx.AsyncClient`` across OpenAI-SDK-backed calls.
+
+    An async client is bound to the event loop it first runs on, so it cannot
+    be created at import time. Enter this once on the long-lived loop that
+    serves requests (the FastAPI lifespan); code that calls
+    :func:`get_agent_response` falls back to litellm's own clients.
+    """
+
+    litellm = _get_litellm()
+    client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    litellm.aclient_session = client
+    try:
+        yield
+    finally:
+        litellm.aclient_session = None
+        await client.aclose()
+
+
+# --- Response cache --------------------------------------------------------------
+
+
+def _canonical_json(messages: List[Dict[str, str]]) -> str:
+    """Serialise *messages* deterministically so equal histories share a key."""
+
+    return json.dumps(messages, sort_keys=True, separators=(",", ":"))
+
+
+def _cache_key(model: str, messages: List[Dict[str, str]]) -> str:
+    """Return the exact-match cache key for sending *messages* to *model*."""
+
+    payload = f"{model}\n{_canonical_json(messages)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _open_cache_db(path: Path) -> sqlite3.Connection:
+    """Open the SQLite cache database shared by all workers and runs.
+
+    WAL mode lets concurrent readers proceed while another process writes.
+    """
+
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("CREATE TABLE IF NOT EXISTS c(k TEXT PRIMARY KEY, v TEXT, ts INTEGER)")
+    conn.execute("CREATE INDEX IF NOT EXISTS c_ts ON c(ts)")
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(semantic)")}
+    if columns and not {"encoder", "model"} <= columns:
+        # Rows from before encoder/model were recorded cannot be attributed; drop them.
+        conn.execute("DROP TABLE semantic")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS semantic(id INTEGER PRIMARY KEY, "
+        "encoder TEXT, model TEXT, embedding BLOB, v TEXT, ts INTEGER)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS semantic_ts ON semantic(ts)")
+    return conn
+
+
+class _ResponseCache:
+    """Exact-match cache of assistant replies stored in the SQLite ``c`` table.
+
+    Entries older than *ttl* seconds are ignored and deleted on the next insert.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock, ttl: float) -> None:
+        self.ttl = ttl
+        self._conn = conn
+        self._lock = lock
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT v FROM c WHERE k = ? AND ts >= ?",
+                (key, int(time.time() - self.ttl)),
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, key: str, reply: str) -> None:
+        now = int(time.time())
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO c(k, v, ts) VALUES (?, ?, ?)", (key, reply, now)
+            )
+            self._conn.execute("DELETE FROM c WHERE ts < ?", (int(now - self.ttl),))
+
+
+class _SemanticCache:
+    """Nearest-neighbour cache of assistant replies keyed on question embeddings.
+
+    Rows live in the SQLite ``semantic`` table; an in-memory matrix of the
+    L2-normalised embeddings mirrors it so a lookup is one matrix-vector
+    product. Rows written by other workers are picked up incrementally before
+    each lookup. Entries older than *ttl* seconds are ignored and deleted.
+
+    Each row records the sentence encoder that embedded it and the chat model
+    that wrote the reply. Rows from another encoder are never loaded (their
+    dimension may differ), and a lookup only matches replies of the model it
+    asks for.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        lock: threading.Lock,
+        model_name: str,
+        threshold: float,
+        ttl: float,
+    ) -> None:
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl = ttl
+        self._conn = conn
+        self._lock = lock
+        self._encoder: Any = None
+        self._embeddings: Any = None  # numpy.ndarray of shape (n, dim)
+        self._replies: List[str] = []
+        self._models: List[str] = []
+        self._timestamps: List[int] = []
+        self._last_id = 0
+
+    def _encode(self, text: str) -> Any:
+        if self._encoder is None:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+
+            self._encoder = SentenceTransformer(self.model_name)
+        return self._encoder.encode(text, normalize_embeddings=True)
+
+    def _sync(self) -> None:
+        """Drop expired rows from memory and load rows added since the last sync."""
+
+        import numpy as np  # type: ignore
+
+        cutoff = int(time.time() - self.ttl)
+        keep = [i for i, ts in enumerate(self._timestamps) if ts >= cutoff]
+        rows = self._conn.execute(
+            "SELECT id, embedding, v, ts, model FROM semantic "
+            "WHERE id > ? AND ts >= ? AND encoder = ? ORDER BY id",
+            (self._last_id, cutoff, self.model_name),
+        ).fetchall()
+        if len(keep) == len(self._timestamps) and not rows:
+            return
+
+        matrices = [self._embeddings[keep]] if keep else []
+        self._replies = [self._replies[i] for i in keep]
+        self._models = [self._models[i] for i in keep]
+        self._timestamps = [self._timestamps[i] for i in keep]
+        if rows:
+            matrices.append(np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]))
+            self._replies.extend(row[2] for row in rows)
+            self._timestamps.extend(row[3] for row in rows)
+            self._models.extend(row[4] for row in rows)
+            self._last_id = rows[-1][0]
+        self._embeddings = np.vstack(matrices) if matrices else None
+
+    def lookup(self, text: str, model: str) -> tuple[Any, Optional[str]]:
+        """Return ``(embedding, reply)`` for *model*; *reply* is ``None`` on a miss.
+
+        The embedding is handed back so a subsequent :meth:`store` does not
+        have to encode the same text twice.
+        """
+
+        import numpy as np  # type: ignore
+
+        query = self._encode(text)
+        with self._lock:
+            self._sync()
+            if self._embeddings is None:
+                return query, None
+            scores = self._embeddings @ query
+            scores[np.asarray(self._models) != model] = -np.inf
+            best = int(scores.argmax())
+            if scores[best] >= self.threshold:
+                return query, self._replies[best]
+        return query, None
+
+    def store(self, embedding: Any, reply: str, model: str) -> None:
+        """Persist *model*'s *reply* for *embedding*; visible on the next lookup."""
+
+        import numpy as np  # type: ignore
+
+        now = int(time.time())
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO semantic(encoder, model, embedding, v, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.model_name, model, blob, reply, now),
+            )
+            self._conn.execute("DELETE FROM semantic WHERE ts < ?", (int(now - self.ttl),))
+
+
+_cache_db: Optional[sqlite3.Connection] = (
+    _open_cache_db(CACHE_PATH) if CACHE_ENABLED or SEMANTIC_CACHE_ENABLED else None
+)
+_cache_db_lock = threading.Lock()
+
+_response_cache: Optional[_ResponseCache] = (
+    _ResponseCache(_cache_db, _cache_db_lock, CACHE_TTL)  # type: ignore[arg-type]
+    if CACHE_ENABLED
+    else None
+)
+
+_semantic_cache: Optional[_SemanticCache] = (
+    _SemanticCache(
+        _cache_db,  # type: ignore[arg-type]
+        _cache_db_lock,
+        SEMANTIC_CACHE_MODEL,
+        SEMANTIC_CACHE_THRESHOLD,
+        SEMANTIC_CACHE_TTL,
+    )
+    if SEMANTIC_CACHE_ENABLED
+    else None
+)
+
+
+def _semantic_cache_query(messages: List[Dict[str, str]]) -> Optional[str]:
+    """Return the user question to look up, or ``None`` if the cache does not apply.
+
+    Only opening questions are cached: a follow-up such as "make it vegetarian"
+    depends on the earlier turns and must not be answered from another
+    conversation.
+    """
+
+    user_turns = [msg["content"] for msg in messages if msg["role"] == "user"]
+    if len(user_turns) != 1:
+        return None
+    return user_turns[0]
+
+
+def _select_model(messages: List[Dict[str, str]]) -> str:
+    """Pick the cascade tier for the latest user turn in *messages*."""
+
+    if CHEAP_MODEL == STRONG_MODEL:
+        return STRONG_MODEL
+
+    last_user = next(
+        (msg["content"] for msg in reversed(messages) if msg["role"] == "user"), ""
+    )
+    if len(last_user) > CASCADE_MAX_CHARS or CASCADE_STRONG_PATTERN.search(last_user):
+        return STRONG_MODEL
+    return CHEAP_MODEL
+
+
+def _with_system_prompt(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Return *messages* with the system prompt prepended unless already present.
+
+    When a system message is already first, *messages* itself is returned.
+    """
+
+    if not messages or messages[0]["role"] != "system":
+        return [_SYSTEM_MSG, *messages]
+    return messages
+
+
+def _uses_prompt_cache_control(model: str) -> bool:
+    """Return whether *model* needs explicit ``cache_control`` markers (Anthropic)."""
+
+    return model.startswith(("anthropic/", "claude"))
+
+
+def _is_cacheable_prefix(model: str, text: str) -> bool:
+    """Return whether *text* is long enough for *model*'s provider prompt cache.
+
+    Uses the rough four-characters-per-token estimate; erring either way only
+    means a marker is sent that the provider ignores, or one is left out.
+    """
+
+    min_tokens = (
+        PROMPT_CACHE_MIN_TOKENS_HAIKU if "haiku" in model else PROMPT_CACHE_MIN_TOKENS
+    )
+    return len(text) // 4 >= min_tokens
+
+
+def _provider_messages(model: str, messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Return *messages* in the shape sent over the wire to *model*.
+
+    For Anthropic models the leading system prompt becomes a text block tagged
+    with ``cache_control`` so the provider can reuse its prefill across turns,
+    provided the prompt reaches the minimum cacheable length. The history
+    handed back to callers keeps plain string contents.
+    """
+
+    if not messages or messages[0]["role"] != "system":
+        return messages
+    if not _uses_prompt_cache_control(model):
+        return messages
+    if not _is_cacheable_prefix(model, messages[0]["content"]):
+        return messages
+
+    system_message: Dict[str, Any] = {
+        "role": "system",
+        "content": [
+            {
+                "type": "text",
+                "text": messages[0]["content"],
+                "cache_control": PROMPT_CACHE_CONTROL,
+            }
+        ],
+    }
+    return [system_message] + messages[1:]
+
+
+def _reply_content(completion: Any) -> str:
+    """Extract the stripped assistant reply from a litellm completion."""
+
+    return completion["choices"][0]["message"]["content"].strip()  # type: ignore[index]
+
+
+async def _call_model(model: str, messages: List[Dict[str, str]]) -> str:
+    """Send *messages* to *model* and return the stripped assistant reply."""
+
+    completion = await _acompletion(
+        model=model,
+        messages=_provider_messages(model, messages),  # Pass the full history
+    )
+
+    return _reply_content(completion)
+
+
+def _call_model_sync(model: str, messages: List[Dict[str, str]]) -> str:
+    """Blocking counterpart of :func:`_call_model` built on ``litellm.completion``."""
+
+    completion = _completion(
+        model=model,
+        messages=_provider_messages(model, messages),  # Pass the full history
+    )
+
+    return _reply_content(completion)
+
+
+async def _gather_completions(
+    model: str, all_messages: List[List[Dict[str, str]]], max_concurrency: int
+) -> List[str]:
+    """Run one ``litellm.acompletion`` per conversation, at most *max_concurrency* at a time."""
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _one(messages: List[Dict[str, str]]) -> str:
+        async with semaphore:
+            return await _call_model(model, messages)
+
+    return await asyncio.gather(*(_one(messages) for messages in all_messages))
+
+
+# --- History compaction ----------------------------------------------------------
+
+_summaries: Dict[str, str] = {}
+_summaries_lock = threading.Lock()
+
+
+def _summarize_turns(turns: List[Dict[str, str]], step: int) -> str:
+    """Return a summary of *turns*, extending the cached summary of ``turns[:-step]``.
+
+    Compaction cut points are multiples of *step*, so the previous summary is
+    usually cached and only the newest *step* turns need to be folded in.
+    """
+
+    key = _cache_key(CHEAP_MODEL, turns)
+    with _summaries_lock:
+        cached = _summaries.get(key)
+    if cached is not None:
+        return cached
+
+    with _summaries_lock:
+        previous = _summaries.get(_cache_key(CHEAP_MODEL, turns[:-step]))
+    new_turns = turns[-step:] if previous is not None else turns
+    transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in new_turns)
+    if previous is not None:
+        transcript = f"Summary of the earlier dialog: {previous}\n{transcript}"
+
+    completion = _completion(
+        model=CHEAP_MODEL,
+        messages=[{"role": "user", "content": f"{SUMMARY_PROMPT}\n\n{transcript}"}],
+    )
+    summary = _reply_content(completion)
+
+    with _summaries_lock:
+        _summaries[key] = summary
+        if len(_summaries) > _SUMMARY_CACHE_MAXSIZE:
+            del _summaries[next(iter(_summaries))]
+    return summary
+
+
+def _needs_compaction(
+    messages: List[Dict[str, str]], summary_trigger: int = HISTORY_SUMMARY_TRIGGER
+) -> bool:
+    """Return whether *messages* has more turns than *summary_trigger* allows."""
+
+    turns = len(messages) - (1 if messages and messages[0]["role"] == "system" else 0)
+    return 0 < summary_trigger < turns
+
+
+def _compact(
+    messages: List[Dict[str, str]],
+    keep_last: int = HISTORY_KEEP_LAST,
+    summary_trigger: int = HISTORY_SUMMARY_TRIGGER,
+) -> List[Dict[str, str]]:
+    """Return the history to send: a running summary of old turns plus recent ones.
+
+    The input is not modified. Histories with at most *summary_trigger* turns
+    are returned as is; an invalid window raises ``ValueError``.
+    """
+
+    if not _needs_compaction(messages, summary_trigger):
+        return messages
+
+    step = _history_step(keep_last, summary_trigger)
+
+    has_system = messages[0]["role"] == "system"
+    system, turns = (messages[:1], messages[1:]) if has_system else ([], messages)
+    cut = (len(turns) - keep_last) // step * step
+    summary = _summarize_turns(turns[:cut], step)
+    return [
+        *system,
+        {"role": "system", "content": f"Conversation so far: {summary}"},
+        *turns[cut:],
+    ]
+
+
 # --- Agent wrapper ---------------------------------------------------------------
 
 
-def get_agent_response(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:  # noqa: WPS231
-    """Call the underlying large-language model via *litellm*.
+class _CacheLookup(NamedTuple):
+    """Outcome of consulting the response caches for one request."""
+
+    reply: Optional[str]
+    cache_key: Optional[str] = None
+    semantic_query: Optional[str] = None
+    embedding: Any = None
+
+
+def _caches_enabled() -> bool:
+    """Return whether any response cache is configured."""
+
+    return _response_cache is not None or _semantic_cache is not None
+
+
+def _lookup_caches(current_messages: List[Dict[str, str]], model: str) -> _CacheLookup:
+    """Look for a cached reply; blocking (SQLite I/O and question embedding)."""
+
+    semantic_query = (
+        _semantic_cache_query(current_messages) if _semantic_cache is not None else None
+    )
+    embedding = None
+    if semantic_query is not None:
+        embedding, cached_reply = _semantic_cache.lookup(  # type: ignore[union-attr]
+            semantic_query, model
+        )
+        if cached_reply is not None:
+            return _CacheLookup(cached_reply)
+
+    if _response_cache is None:
+        return _CacheLookup(None, None, semantic_query, embedding)
+    cache_key = _cache_key(model, current_messages)
+    return _CacheLookup(_response_cache.get(cache_key), cache_key, semantic_query, embedding)
+
+
+def _remember(lookup: _CacheLookup, reply: str, answered_by: str) -> None:
+    """Store a freshly generated *reply* in the caches consulted by *lookup*.
+
+    The exact-match entry stays under the key of the routed request, so a
+    repeat that was escalated skips the failed cheap attempt. Semantic entries
+    are tagged with *answered_by*, the model that actually wrote the reply.
+    """
+
+    if _response_cache is not None and lookup.cache_key is not None:
+        _response_cache.put(lookup.cache_key, reply)
+    if _semantic_cache is not None and lookup.semantic_query is not None:
+        _semantic_cache.store(lookup.embedding, reply, answered_by)
+
+
+async def _respond(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:  # noqa: WPS231
+    """Async body of the agent wrapper; blocking cache work runs in worker threads."""
+
+    # litellm is model-agnostic; we only need to supply the model name and key.
+    # The first message is assumed to be the system prompt if not explicitly provided
+    # or if the history is empty. We'll ensure the system prompt is always first.
+    current_messages = _with_system_prompt(messages)
+    model = _select_model(current_messages)
+
+    # Cache lookups embed the question and hit SQLite, so keep them off the loop.
+    lookup = (
+        await asyncio.to_thread(_lookup_caches, current_messages, model)
+        if _caches_enabled()
+        else _CacheLookup(None)
+    )
+    assistant_reply_content = lookup.reply
+    if assistant_reply_content is None:
+        # Only the request is compacted; callers keep the full history.
+        request_messages = current_messages
+        if _needs_compaction(current_messages):
+            request_messages = await asyncio.to_thread(_compact, current_messages)
+        answered_by = model
+        assistant_reply_content = await _call_model(model, request_messages)
+        if not assistant_reply_content and model != STRONG_MODEL:
+            # The cheap tier gave up; escalate instead of returning nothing.
+            answered_by = STRONG_MODEL
+            assistant_reply_content = await _call_model(STRONG_MODEL, request_messages)
+        if _caches_enabled():
+            await asyncio.to_thread(
+                _remember, lookup, assistant_reply_content, answered_by
+            )
+
+    # Append assistant's response to the history
+    current_messages.append({"role": "assistant", "content": assistant_reply_content})
+    return current_messages
+
+
+def _respond_sync(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:  # noqa: WPS231
+    """Blocking body of the agent wrapper; mirrors :func:`_respond` step by step."""
+
+    current_messages = _with_system_prompt(messages)
+    model = _select_model(current_messages)
+
+    lookup = _lookup_caches(current_messages, model)
+    assistant_reply_content = lookup.reply
+    if assistant_reply_content is None:
+        # Only the request is compacted; callers keep the full history.
+        request_messages = _compact(current_messages)
+        answered_by = model
+        assistant_reply_content = _call_model_sync(model, request_messages)
+        if not assistant_reply_content and model != STRONG_MODEL:
+            # The cheap tier gave up; escalate instead of returning nothing.
+            answered_by = STRONG_MODEL
+            assistant_reply_content = _call_model_sync(STRONG_MODEL, request_messages)
+        _remember(lookup, assistant_reply_content, answered_by)
+
+    # Append assistant's response to the history
+    current_messages.append({"role": "assistant", "content": assistant_reply_content})
+    return current_messages
+
+
+async def get_agent_response_async(
+    messages: List[Dict[str, str]],
+) -> List[Dict[str, str]]:
+    """Call the underlying large-language model via *litellm* without blocking.
 
     Parameters
     ----------
@@ -113,28 +874,196 @@ def get_agent_response(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
     -------
     List[Dict[str, str]]
         The updated conversation history, including the assistant's new reply.
+        If *messages* already starts with a system message, this is *messages*
+        itself with the reply appended in place; otherwise it is a new list.
+        The system message dict is shared and must not be mutated.
     """
 
-    # litellm is model-agnostic; we only need to supply the model name and key.
-    # The first message is assumed to be the system prompt if not explicitly provided
-    # or if the history is empty. We'll ensure the system prompt is always first.
-    current_messages: List[Dict[str, str]]
-    if not messages or messages[0]["role"] != "system":
-        current_messages = [{"role": "system", "content": SYSTEM_PROMPT}] + messages
-    else:
-        current_messages = messages
+    return await _respond(messages)
+
+
+async def get_agent_response_threaded(
+    messages: List[Dict[str, str]],
+) -> List[Dict[str, str]]:
+    """Drop-in alternative to :func:`get_agent_response_async` using a worker thread.
+
+    The synchronous :func:`get_agent_response` runs via ``asyncio.to_thread`` so
+    the event loop stays free; use it for providers that lack native async support.
+    """
+
+    return await asyncio.to_thread(_respond_sync, messages)
+
+
+def get_agent_response(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Call the underlying large-language model via *litellm*, blocking until done.
+
+    This is the entry point for scripts such as ``scripts/bulk_test.py``. It
+    never starts an event loop, so it is safe to call from worker threads.
+    Arguments and return value are as for :func:`get_agent_response_async`.
+    """
+
+    return _respond_sync(messages)
+
+
+def stream_agent_response(messages: List[Dict[str, str]]) -> Iterator[str]:
+    """Yield the assistant's reply piece by piece as the model generates it.
+
+    Parameters
+    ----------
+    messages:
+        The full conversation history. Each item is a dict with "role" and "content".
+
+    Yields
+    ------
+    str
+        Consecutive fragments of the assistant's reply. Callers are responsible
+        for appending the concatenated reply to their history. The response
+        caches are not consulted.
+    """
+
+    current_messages = _with_system_prompt(messages)
+    model = _select_model(current_messages)
 
-    completion = litellm.completion(
-        model=MODEL_NAME,
-        messages=current_messages,  # Pass the full history
+    stream = _completion(
+        model=model,
+        messages=_provider_messages(model, _compact(current_messages)),
+        stream=True,
     )
+    for chunk in stream:
+        delta = chunk["choices"][0]["delta"].get("content")  # type: ignore[index]
+        if delta:
+            yield delta
 
-    assistant_reply_content: str = completion["choices"][0]["message"][
-        "content"
-    ].strip()  # type: ignore[index]
 
-    # Append assistant's response to the history
-    updated_messages = current_messages + [
-        {"role": "assistant", "content": assistant_reply_content}
-    ]
-    return updated_messages
+def get_agent_responses(
+    messages_list: List[List[Dict[str, str]]],
+    *,
+    max_concurrency: int = 8,
+    use_batch_api: bool = True,
+) -> List[List[Dict[str, str]]]:
+    """Answer several independent conversations in one go.
+
+    Parameters
+    ----------
+    messages_list:
+        One conversation history per item, in the same format accepted by
+        :func:`get_agent_response`.
+    max_concurrency:
+        Upper bound on simultaneous requests when ``use_batch_api`` is false.
+    use_batch_api:
+        Dispatch everything through ``litellm.batch_completion``. Items that
+        fail there are re-sent one by one with the usual transient-error
+        retries, so the successful replies of the batch are kept. Set to false
+        for providers without batch support to fan out ``litellm.acompletion``
+        calls instead.
+
+    Returns
+    -------
+    List[List[Dict[str, str]]]
+        The updated conversation histories, in the same order as the input.
+        Histories are extended in place as described for
+        :func:`get_agent_response_async`.
+    """
+
+    all_messages = [_with_system_prompt(messages) for messages in messages_list]
+    if not all_messages:
+        return []
+
+    replies: List[str]
+    if use_batch_api:
+        completions = _get_litellm().batch_completion(
+            **_with_provider(
+                {
+                    "model": MODEL_NAME,
+                    "messages": [
+                        _provider_messages(MODEL_NAME, msgs) for msgs in all_messages
+                    ],
+                }
+            )
+        )
+        replies = []
+        for current_messages, completion in zip(all_messages, completions):
+            # batch_completion returns failed requests as exception objects;
+            # re-send just those through the retrying single-call path.
+            if isinstance(completion, Exception):
+                completion = _completion(
+                    model=MODEL_NAME,
+                    messages=_provider_messages(MODEL_NAME, current_messages),
+                )
+            replies.append(_reply_content(completion))
+    else:
+        replies = asyncio.run(
+            _gather_completions(MODEL_NAME, all_messages, max_concurrency)
+        )
+
+    for current_messages, reply in zip(all_messages, replies):
+        current_messages.append({"role": "assistant", "content": reply})
+    return all_messages
+
+
+def _parse_batched_answers(text: str, count: int) -> Dict[int, str]:
+    """Split a batched reply into ``{question index: answer}`` (0-based)."""
+
+    answers: Dict[int, str] = {}
+    for match in _BATCH_ANSWER_RE.finditer(text):
+        index = int(match.group(1)) - 1
+        answer = match.group(2).strip()
+        if 0 <= index < count and answer:
+            answers.setdefault(index, answer)
+    return answers
+
+
+def get_agent_responses_batched(
+    user_prompts: List[str], batch_size: int = 6, *, max_retries: int = 1
+) -> List[str]:
+    """Answer many standalone questions using one LLM request per *batch_size* of them.
+
+    Intended for dataset-style workloads (evaluation, pre-generation), where it
+    trades a single long completion for many short ones.
+
+    Parameters
+    ----------
+    user_prompts:
+        Independent user questions; no conversation history is carried over.
+    batch_size:
+        Number of questions packed into one request.
+    max_retries:
+        How often a batch is re-sent when some answers cannot be parsed. Any
+        question still unanswered afterwards is asked on its own.
+
+    Returns
+    -------
+    List[str]
+        One assistant reply per prompt, in the same order as *user_prompts*.
+    """
+
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+
+    replies: List[str] = []
+    for start in range(0, len(user_prompts), batch_size):
+        batch = user_prompts[start : start + batch_size]
+        questions = "\n".join(f"Q{i}: {prompt}" for i, prompt in enumerate(batch, 1))
+        current_messages = [
+            _SYSTEM_MSG,
+            {"role": "user", "content": f"{BATCH_PROMPT_HEADER}\n{questions}"},
+        ]
+
+        answers: Dict[int, str] = {}
+        for _ in range(max_retries + 1):
+            completion = _completion(
+                model=MODEL_NAME,
+                messages=_provider_messages(MODEL_NAME, current_messages),
+            )
+            parsed = _parse_batched_answers(_reply_content(completion), len(batch))
+            answers = {**parsed, **answers}
+            if len(answers) == len(batch):
+                break
+
+        for index, prompt in enumerate(batch):
+            if index not in answers:
+                history = get_agent_response([{"role": "user", "content": prompt}])
+                answers[index] = history[-1]["content"]
+        replies.extend(answers[index] for index in range(len(batch)))
+
+    return replies
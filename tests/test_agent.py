@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import pytest
+
+from backend import utils
+
+"""Tests for the agent wrappers in ``backend.utils``."""
+
+
+@pytest.fixture
+def completions(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    """Replace the blocking model call; returns the kwargs of every call."""
+
+    calls: List[Dict[str, Any]] = []
+
+    def fake_completion(**kwargs: Any) -> Dict[str, Any]:
+        # The sync path must not run inside (or create) an event loop.
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        calls.append(kwargs)
+        question = kwargs["messages"][-1]["content"]
+        return {"choices": [{"message": {"content": f" answer to {question} "}}]}
+
+    monkeypatch.setattr(utils, "_completion", fake_completion)
+    monkeypatch.setattr(utils, "_response_cache", None)
+    monkeypatch.setattr(utils, "_semantic_cache", None)
+    return calls
+
+
+def test_get_agent_response_is_synchronous(completions: List[Dict[str, Any]]) -> None:
+    history = utils.get_agent_response([{"role": "user", "content": "pilaf"}])
+
+    assert history[0] is utils._SYSTEM_MSG
+    assert history[-1] == {"role": "assistant", "content": "answer to pilaf"}
+    assert len(completions) == 1
+
+
+def test_get_agent_response_from_worker_threads(
+    completions: List[Dict[str, Any]],
+) -> None:
+    questions = [f"q{i}" for i in range(20)]
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        histories = list(
+            executor.map(
+                lambda q: utils.get_agent_response([{"role": "user", "content": q}]),
+                questions,
+            )
+        )
+
+    assert [h[-1]["content"] for h in histories] == [f"answer to {q}" for q in questions]
+
+
+def test_get_agent_response_async_uses_acompletion(
+    monkeypatch: pytest.MonkeyPatch, completions: List[Dict[str, Any]]
+) -> None:
+    async def fake_acompletion(**kwargs: Any) -> Dict[str, Any]:
+        return {"choices": [{"message": {"content": "async answer"}}]}
+
+    monkeypatch.setattr(utils, "_acompletion", fake_acompletion)
+
+    history = asyncio.run(
+        utils.get_agent_response_async([{"role": "user", "content": "pilaf"}])
+    )
+
+    assert history[-1] == {"role": "assistant", "content": "async answer"}
+    assert completions == []
+
+
+def test_escalated_reply_is_remembered_under_the_strong_model(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    stored: List[Any] = []
+
+    class FakeSemanticCache:
+        def lookup(self, text: str, model: str) -> Any:
+            return "embedding", None
+
+        def store(self, embedding: Any, reply: str, model: str) -> None:
+            stored.append((reply, model))
+
+    def fake_completion(**kwargs: Any) -> Dict[str, Any]:
+        content = "" if kwargs["model"] == "cheap" else "strong answer"
+        return {"choices": [{"message": {"content": content}}]}
+
+    monkeypatch.setattr(utils, "CHEAP_MODEL", "cheap")
+    monkeypatch.setattr(utils, "STRONG_MODEL", "strong")
+    monkeypatch.setattr(utils, "_completion", fake_completion)
+    monkeypatch.setattr(utils, "_response_cache", None)
+    monkeypatch.setattr(utils, "_semantic_cache", FakeSemanticCache())
+
+    history = utils.get_agent_response([{"role": "user", "content": "pilaf"}])
+
+    assert history[-1]["content"] == "strong answer"
+    assert stored == [("strong answer", "strong")]
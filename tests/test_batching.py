@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from backend import utils
+
+"""Tests for parsing batched replies in ``backend.utils``."""
+
+
+def test_answers_are_split_by_question_number() -> None:
+    text = "### Answer 1: Boil pasta.\n\n### Answer 2:\nToast the rice\nfirst.\n"
+
+    assert utils._parse_batched_answers(text, 2) == {
+        0: "Boil pasta.",
+        1: "Toast the rice\nfirst.",
+    }
+
+
+def test_out_of_range_and_empty_answers_are_dropped() -> None:
+    text = "### Answer 0: zero\n### Answer 2:   \n### Answer 3: three\n### Answer 4: four"
+
+    assert utils._parse_batched_answers(text, 3) == {2: "three"}
+
+
+def test_first_occurrence_wins() -> None:
+    text = "### Answer 1: first\n### Answer 1: second"
+
+    assert utils._parse_batched_answers(text, 1) == {0: "first"}
+
+
+def test_reply_without_markers_yields_nothing() -> None:
+    assert utils._parse_batched_answers("Here are your recipes!", 2) == {}
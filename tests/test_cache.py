@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from backend import utils
+
+"""Tests for the SQLite-backed response caches in ``backend.utils``."""
+
+np = pytest.importorskip("numpy")
+
+# Orthogonal unit vectors, so only identical questions are similar.
+_VECTORS: Dict[str, Any] = {
+    text: np.eye(3, dtype=np.float32)[i] for i, text in enumerate(("pilaf", "menemen", "baklava"))
+}
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> List[float]:
+    """Freeze ``time.time`` inside ``backend.utils``; set ``clock[0]`` to advance it."""
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(utils, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Iterator[sqlite3.Connection]:
+    conn = utils._open_cache_db(tmp_path / "cache.sqlite3")
+    yield conn
+    conn.close()
+
+
+def _semantic(db: sqlite3.Connection, encoder: str = "stub-encoder") -> utils._SemanticCache:
+    cache = utils._SemanticCache(db, threading.Lock(), encoder, threshold=0.9, ttl=100)
+    cache._encode = _VECTORS.__getitem__  # type: ignore[method-assign]
+    return cache
+
+
+def test_response_cache_expires_entries(db: sqlite3.Connection, clock: List[float]) -> None:
+    cache = utils._ResponseCache(db, threading.Lock(), ttl=100)
+    cache.put("k", "reply")
+
+    clock[0] += 100
+    assert cache.get("k") == "reply"
+
+    clock[0] += 1
+    assert cache.get("k") is None
+
+    # The next insert deletes the expired row.
+    cache.put("other", "reply")
+    assert [row[0] for row in db.execute("SELECT k FROM c")] == ["other"]
+
+
+def test_semantic_cache_syncs_rows_from_other_workers(db: sqlite3.Connection, clock: List[float]) -> None:
+    writer, reader = _semantic(db), _semantic(db)
+
+    embedding, reply = reader.lookup("pilaf", "m")
+    assert reply is None
+    writer.store(embedding, "rice", "m")
+    assert reader.lookup("pilaf", "m")[1] == "rice"
+    assert reader._last_id == 1
+
+    # Only rows added since the last sync are loaded.
+    writer.store(_VECTORS["menemen"], "eggs", "m")
+    assert reader.lookup("menemen", "m")[1] == "eggs"
+    assert reader._replies == ["rice", "eggs"]
+    assert reader.lookup("baklava", "m")[1] is None
+
+    # Expired rows are dropped from memory as well.
+    clock[0] += 101
+    assert reader.lookup("pilaf", "m")[1] is None
+    assert reader._embeddings is None
+
+
+def test_semantic_cache_filters_on_encoder_and_model(db: sqlite3.Connection, clock: List[float]) -> None:
+    cache = _semantic(db)
+    cache.store(_VECTORS["pilaf"], "cheap rice", "cheap")
+
+    assert cache.lookup("pilaf", "cheap")[1] == "cheap rice"
+    assert cache.lookup("pilaf", "strong")[1] is None
+
+    other_encoder = _semantic(db, encoder="other-encoder")
+    assert other_encoder.lookup("pilaf", "cheap")[1] is None
+    assert other_encoder._replies == []
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pytest
+
+from backend import utils
+
+"""Tests for the history compaction in ``backend.utils``."""
+
+
+def _history(turns: int) -> List[Dict[str, str]]:
+    """Return the system prompt followed by *turns* alternating user/assistant turns."""
+
+    roles = ("user", "assistant")
+    return [utils._SYSTEM_MSG] + [
+        {"role": roles[i % 2], "content": f"turn {i}"} for i in range(turns)
+    ]
+
+
+@pytest.fixture
+def summarizer(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """Replace the summary model call; returns the prompts it received."""
+
+    prompts: List[str] = []
+
+    def fake_completion(**kwargs: Any) -> Dict[str, Any]:
+        prompts.append(kwargs["messages"][0]["content"])
+        content = f"summary {len(prompts)}"
+        return {"choices": [{"message": {"content": content}}]}
+
+    monkeypatch.setattr(utils, "_completion", fake_completion)
+    monkeypatch.setattr(utils, "_summaries", {})
+    return prompts
+
+
+def test_short_history_is_sent_unchanged(summarizer: List[str]) -> None:
+    history = _history(16)
+
+    assert utils._compact(history, keep_last=8, summary_trigger=16) is history
+    assert summarizer == []
+
+
+def test_cut_points_and_summary_reuse(summarizer: List[str]) -> None:
+    compacted = utils._compact(_history(17), keep_last=8, summary_trigger=16)
+
+    assert compacted[0] is utils._SYSTEM_MSG
+    assert compacted[1] == {"role": "system", "content": "Conversation so far: summary 1"}
+    assert [msg["content"] for msg in compacted[2:]] == [f"turn {i}" for i in range(8, 17)]
+    assert "turn 7" in summarizer[0] and "turn 8" not in summarizer[0]
+
+    # 18-23 turns fall in the same window, so the cached summary is reused.
+    utils._compact(_history(23), keep_last=8, summary_trigger=16)
+    assert len(summarizer) == 1
+
+    compacted = utils._compact(_history(25), keep_last=8, summary_trigger=16)
+
+    assert compacted[1]["content"] == "Conversation so far: summary 2"
+    assert [msg["content"] for msg in compacted[2:]] == [f"turn {i}" for i in range(16, 25)]
+    # Only turns 8-15 are new; the rest comes from the previous summary.
+    assert "summary 1" in summarizer[1]
+    assert "turn 8" in summarizer[1] and "turn 7" not in summarizer[1]
+
+
+def test_arguments_override_configured_window(summarizer: List[str]) -> None:
+    compacted = utils._compact(_history(9), keep_last=2, summary_trigger=4)
+
+    assert [msg["content"] for msg in compacted[2:]] == ["turn 6", "turn 7", "turn 8"]
+    assert compacted[2]["role"] == "user"
+
+
+@pytest.mark.parametrize(
+    ("keep_last", "summary_trigger"), [(8, 8), (10, 8), (8, 15), (0, 8)]
+)
+def test_invalid_window_is_rejected(keep_last: int, summary_trigger: int) -> None:
+    with pytest.raises(ValueError):
+        utils._history_step(keep_last, summary_trigger)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from backend import utils
+
+"""Tests for the provider-specific message shaping in ``backend.utils``."""
+
+
+def _history(system_prompt: str) -> list:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": "menemen"},
+    ]
+
+
+def test_short_system_prompt_is_not_marked() -> None:
+    history = _history(utils.SYSTEM_PROMPT)
+
+    assert utils._provider_messages("anthropic/claude-sonnet-4-5", history) is history
+
+
+def test_long_system_prompt_is_marked_for_anthropic() -> None:
+    history = _history("x" * 4 * utils.PROMPT_CACHE_MIN_TOKENS)
+
+    sent = utils._provider_messages("anthropic/claude-sonnet-4-5", history)
+
+    assert sent[0]["content"][0]["cache_control"] == utils.PROMPT_CACHE_CONTROL
+    assert sent[1:] == history[1:]
+    assert history[0]["content"] == "x" * 4 * utils.PROMPT_CACHE_MIN_TOKENS
+
+
+def test_haiku_needs_a_longer_prefix() -> None:
+    history = _history("x" * 4 * utils.PROMPT_CACHE_MIN_TOKENS)
+
+    assert utils._provider_messages("anthropic/claude-3-haiku-20240307", history) is history
+
+
+def test_other_providers_are_untouched() -> None:
+    history = _history("x" * 4 * utils.PROMPT_CACHE_MIN_TOKENS_HAIKU)
+
+    assert utils._provider_messages("openai/gpt-4.1-nano", history) is history
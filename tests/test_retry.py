@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from tenacity import wait_none
+
+from backend import utils
+
+"""Tests for the retry wrappers around litellm in ``backend.utils``."""
+
+
+class RateLimitError(Exception):
+    pass
+
+
+class OtherError(Exception):
+    pass
+
+
+@pytest.fixture
+def attempts(monkeypatch: pytest.MonkeyPatch) -> List[Dict[str, Any]]:
+    """Install a fake litellm whose calls always hit a 429; returns their kwargs."""
+
+    calls: List[Dict[str, Any]] = []
+
+    def completion(**kwargs: Any) -> Any:
+        calls.append(kwargs)
+        raise RateLimitError("429")
+
+    async def acompletion(**kwargs: Any) -> Any:
+        return completion(**kwargs)
+
+    fake = SimpleNamespace(
+        completion=completion,
+        acompletion=acompletion,
+        RateLimitError=RateLimitError,
+        APIConnectionError=OtherError,
+        InternalServerError=OtherError,
+        ServiceUnavailableError=OtherError,
+    )
+    monkeypatch.setattr(utils, "_litellm", fake)
+    monkeypatch.setattr(utils, "_providers", {"m": "openai"})
+    return calls
+
+
+def test_completion_is_retried_by_tenacity_only(attempts: List[Dict[str, Any]]) -> None:
+    completion = utils._completion.retry_with(wait=wait_none())
+
+    with pytest.raises(RateLimitError):
+        completion(model="m", messages=[])
+
+    assert len(attempts) == 5
+    assert all(call["max_retries"] == 0 for call in attempts)
+
+
+def test_acompletion_is_retried_by_tenacity_only(attempts: List[Dict[str, Any]]) -> None:
+    acompletion = utils._acompletion.retry_with(wait=wait_none())
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(acompletion(model="m", messages=[]))
+
+    assert len(attempts) == 5
+    assert all(call["max_retries"] == 0 for call in attempts)